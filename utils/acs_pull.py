@@ -2,10 +2,9 @@
 
 # This code extracts data about internet use from the ACS for the state of Illinois.
 
-import requests
 import pandas as pd
 import numpy as np
-from constants import ACS_KEY
+import http_client
 
 class CensusAPI:
     """
@@ -13,17 +12,25 @@ class CensusAPI:
     The default is at the census tract level and for the state of Illinois.
     """
 
-    def __init__(self, year):
+    def __init__(self, year, key=None):
         """
         Initializes a new instance of the CensusAPI class.
 
         Inputs:
             - year (int): An integer with the year the data want to be
               consulted
+            - key (str): Census API key. If None, it is read from ACS_KEY in
+              constants.py
         """
 
         assert isinstance(year, int), f"year parameter is 'str' and should be 'int'"
 
+        if key is None:
+            from constants import ACS_KEY
+
+            key = ACS_KEY
+        self.key = key
+
         self.base_url_macro_table = (
             "https://api.census.gov/data/" + str(year) + "/acs/acs5"
         )
@@ -71,8 +78,8 @@ class CensusAPI:
         cols = ",".join(cols)
 
         # Define the API calls
-        full_url_macro = f"{self.base_url_macro_table}?get={cols}&for={geo}&in=state:{state}&key={ACS_KEY}"
-        data_response_macro = requests.get(full_url_macro)
+        full_url_macro = f"{self.base_url_macro_table}?get={cols}&for={geo}&in=state:{state}&key={self.key}"
+        data_response_macro = http_client.get(full_url_macro)
 
         macro_json = data_response_macro.json()
 
@@ -126,21 +133,31 @@ class CensusAPI:
 
         return dataframe
     
-#-------------------------------------------
+def export_acs(year=2021, data_path="../data/"):
+    """
+    Retrieves ACS data at the census tract and block group levels and saves
+    them as csv files.
 
-#Creating an instance of the CensusAPI class
+    Inputs:
+        - year (int): year of the ACS 5-year estimates
+        - data_path (str): directory where the csv files are saved
+    """
+    api = CensusAPI(year)
+
+    #Data at Tract level
+    df = api.get_data()
+    df.loc[:,"GEOID20"] = df.loc[:,"geo_id"].str[9:]
 
-year = 2021
-api = CensusAPI(year)
+    df.to_csv(data_path + "acs_internet_use.csv", index=False)
 
-#Data at Tract level
-df = api.get_data()
-df.loc[:,"GEOID20"] = df.loc[:,"geo_id"].str[9:]
+    #Data at Block group level
+    df = api.get_data(geo='block%20group:*', state="17%20county:*")
+    df.loc[:,"GEOID20"] = df.loc[:,"geo_id"].str[9:]
 
-df.to_csv("../data/acs_internet_use.csv", index=False)
+    df.to_csv(data_path + "acs_internet_use_block.csv", index=False)
 
-#Data at Block group level
-df = api.get_data(geo='block%20group:*', state="17%20county:*")
-df.loc[:,"GEOID20"] = df.loc[:,"geo_id"].str[9:]
 
-df.to_csv("../data/acs_internet_use_block.csv", index=False)
\ No newline at end of file
+#-------------------------------------------
+
+if __name__ == "__main__":
+    export_acs(2021)
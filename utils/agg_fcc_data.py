@@ -1,49 +1,101 @@
 """
 Aggregates FCC's Broadband Data
 
-This code uses the data from the FCC to create a csv file that contains
-broadband data by hexagon.
+This code uses the data from the FCC to create csv files that contain
+broadband data by hexagon and by census tract.
 """
 
+import json
+import os
+
 import pandas as pd
-import geopandas as gpd
 import h3
-from shapely.geometry import Polygon
+from shapely.geometry import Polygon, mapping
+
+import fcc_sketches
+
+H3_RES = 8
+# Resolution used to fill census tracts that are smaller than a H3_RES cell
+FINE_RES = 10
 
 
-def export_data(in_path: str, out_path: str) -> pd.DataFrame:
+def aggregate_hexes(df: pd.DataFrame) -> pd.DataFrame:
     """
+    Aggregates FCC's broadband records by H3 hexagon (resolution 8).
+
     Args:
+        df: a pd.DataFrame with FCC's records (one row per location and provider)
 
     Return:
-
+        df_agg: a pd.DataFrame with the number of providers and the average
+            advertised speeds by hexagon. If the data contains `location_id`,
+            it also has the number of locations in each hexagon
     """
 
-    df = pd.read_csv(in_path, index_col=False)
+    agg_funcs = {
+        "brand_name": "nunique",
+        "max_advertised_download_speed": "mean",
+        "max_advertised_upload_speed": "mean",
+    }
+    if "location_id" in df.columns:
+        agg_funcs["location_id"] = "nunique"
 
-    df_agg = (
-        df.groupby("h3_res8_id")
-        .agg(
-            {
-                "brand_name": "nunique",
-                "max_advertised_download_speed": "mean",
-                "max_advertised_upload_speed": "mean",
-            }
-        )
-        .reset_index()
-    )
+    df_agg = df.groupby("h3_res8_id").agg(agg_funcs).reset_index()
 
     agg_names = {
         "brand_name": "avg_num_providers",
         "max_advertised_download_speed": "avg_max_down_speed",
         "max_advertised_upload_speed": "avg_max_up_speed",
+        "location_id": "num_locations",
     }
 
     df_agg.rename(columns=agg_names, inplace=True)
 
+    return df_agg
+
+
+def export_data(
+    in_path: str,
+    out_path: str,
+    mode: str = "exact",
+    sketch_path: str = None,
+    sketch_mode: str = "auto",
+    hll_p: int = fcc_sketches.HLL_P,
+) -> pd.DataFrame:
+    """
+    Args:
+        in_path: path to the csv file with FCC's broadband data
+        out_path: path where the aggregated csv file is saved
+        mode: "exact" to aggregate the raw records, or "sketch" to aggregate
+            them with mergeable sketches (see `fcc_sketches.py`)
+        sketch_path: if given in "sketch" mode, path where the partial state
+            is saved so it can be merged with other files later
+        sketch_mode: "auto", "bitset" or "hll" (see `fcc_sketches.py`)
+        hll_p: number of bits used to choose the register in "hll" mode
+
+    Return:
+        df_agg: the aggregated pd.DataFrame. In "exact" mode it also has the
+            number of locations by hexagon (`num_locations`), used to weight
+            the tract data, which is not saved in out_path
+    """
+
+    assert mode in ["exact", "sketch"], "mode should be 'exact' or 'sketch'"
+
+    if mode == "exact":
+        df = pd.read_csv(in_path, index_col=False)
+        df_agg = aggregate_hexes(df)
+    else:
+        state = fcc_sketches.sketch_file(in_path, sketch_mode, hll_p)
+        if sketch_path is not None:
+            fcc_sketches.save_sketch(state, sketch_path)
+        df_agg = fcc_sketches.finalize(state)
+
     df_agg.loc[:, "geometry"] = df_agg.loc[:, "h3_res8_id"].apply(h3_to_polygon)
 
-    df_agg.to_csv(out_path, index=False)
+    hex_data = df_agg.drop(columns="num_locations", errors="ignore")
+    hex_data.to_csv(out_path, index=False)
+
+    return df_agg
 
 
 def h3_to_polygon(h3_index):
@@ -55,7 +107,151 @@ def h3_to_polygon(h3_index):
     return Polygon(vertices)
 
 
+def _polyfill(geom, res: int) -> list:
+    """
+    Returns the H3 cells at resolution res whose centers fall inside a
+    Polygon or MultiPolygon.
+    """
+    polygons = geom.geoms if geom.geom_type == "MultiPolygon" else [geom]
+    cells = []
+    for polygon in polygons:
+        cells.extend(h3.polyfill(mapping(polygon), res, geo_json_conformant=True))
+
+    return cells
+
+
+def _boundaries_digest(bound_gdf: "gpd.GeoDataFrame") -> str:
+    """
+    Computes a digest of the census tract boundaries, used to check that a
+    cached cell to tract mapping was built from the same boundaries.
+    """
+    geoms = pd.DataFrame(
+        {
+            "GEOID20": bound_gdf.loc[:, "GEOID20"].values,
+            "geometry": bound_gdf.geometry.to_wkb().values,
+        }
+    )
+
+    return str(pd.util.hash_pandas_object(geoms, index=False).sum())
+
+
+def tract_cells(bound_gdf: "gpd.GeoDataFrame", cache_path: str) -> pd.DataFrame:
+    """
+    Assigns H3 cells (resolution 8) to census tracts by polyfilling each tract.
+    A cell belongs to the tract that contains its center, and has a share of 1.
+
+    Tracts smaller than a cell may not contain any cell center. These tracts
+    are polyfilled at FINE_RES, and each fine cell is mapped to its resolution
+    8 parent with a share equal to the fraction of the parent it covers. If a
+    tract does not contain any fine cell either, the fine cell of its interior
+    point (INTPTLAT20, INTPTLON20) is used. The parents of these cells may also
+    be assigned to a neighbouring tract.
+
+    The mapping is cached in cache_path, together with the resolutions and a
+    digest of the boundaries. The cache is only used if they match.
+
+    Args:
+        bound_gdf: gpd.GeoDataFrame with census tract boundaries (GEOID20)
+        cache_path: path to the csv file with the cell to tract mapping
+
+    Return:
+        cells_df: a pd.DataFrame with columns h3_res8_id, GEOID20 and share
+    """
+
+    meta = {
+        "res": H3_RES,
+        "fine_res": FINE_RES,
+        "boundaries": _boundaries_digest(bound_gdf),
+    }
+    meta_path = cache_path + ".json"
+
+    if os.path.exists(cache_path) and os.path.exists(meta_path):
+        with open(meta_path) as file:
+            if json.load(file) == meta:
+                return pd.read_csv(cache_path, dtype={"GEOID20": str})
+
+    bound_gdf = bound_gdf.to_crs("EPSG:4326")
+    children = 7 ** (FINE_RES - H3_RES)
+
+    cells = []
+    for _, tract in bound_gdf.iterrows():
+        geoid = tract["GEOID20"]
+        tract_ids = _polyfill(tract.geometry, H3_RES)
+        if tract_ids:
+            cells.extend((cell, geoid, 1.0) for cell in tract_ids)
+            continue
+
+        fine_ids = _polyfill(tract.geometry, FINE_RES)
+        if not fine_ids:
+            lat = float(tract["INTPTLAT20"])
+            lon = float(tract["INTPTLON20"])
+            fine_ids = [h3.geo_to_h3(lat, lon, FINE_RES)]
+
+        parents = pd.Series([h3.h3_to_parent(cell, H3_RES) for cell in fine_ids])
+        for parent, count in parents.value_counts().items():
+            cells.append((parent, geoid, count / children))
+
+    cells_df = pd.DataFrame(cells, columns=["h3_res8_id", "GEOID20", "share"])
+    cells_df = cells_df.drop_duplicates(
+        subset=["h3_res8_id", "GEOID20"], ignore_index=True
+    )
+
+    cells_df.to_csv(cache_path, index=False)
+    with open(meta_path, "w") as file:
+        json.dump(meta, file)
+
+    return cells_df
+
+
+def aggregate_tracts(df_agg: pd.DataFrame, cells_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates FCC's broadband data by census tract from the aggregates by
+    hexagon. Hexagons are assigned to tracts with the mapping from
+    `tract_cells`, and their values are weighted by their share in the tract
+    times their number of locations (households and businesses).
+
+    Args:
+        df_agg: a pd.DataFrame with the aggregates by hexagon, including
+            `num_locations` (`export_data` in "exact" mode)
+        cells_df: a pd.DataFrame with columns h3_res8_id, GEOID20 and share
+
+    Return:
+        df_tract: a pd.DataFrame with the average number of providers and the
+            average advertised speeds by census tract
+    """
+
+    if "num_locations" not in df_agg.columns:
+        raise ValueError(
+            "num_locations is needed to weight the tract data. Use the exact "
+            "aggregation of FCC data that contains location_id"
+        )
+
+    df_hex = df_agg.merge(cells_df, on="h3_res8_id", how="inner")
+
+    locations = df_hex.loc[:, "num_locations"]
+    df_hex.loc[:, "weight"] = df_hex.loc[:, "share"] * locations
+
+    agg_cols = ["avg_num_providers", "avg_max_down_speed", "avg_max_up_speed"]
+    for col in agg_cols:
+        df_hex[col] = df_hex.loc[:, col] * df_hex.loc[:, "weight"]
+
+    df_tract = df_hex.groupby("GEOID20")[agg_cols + ["weight"]].sum()
+    df_tract[agg_cols] = df_tract.loc[:, agg_cols].div(
+        df_tract.loc[:, "weight"], axis=0
+    )
+    df_tract = df_tract.rename(columns={"weight": "num_locations"})
+
+    return df_tract.reset_index()
+
+
 # -------------------------------
-# Creating fcc_data_agg.csv
+# Creating fcc_data_agg.csv and fcc_data_tract.csv
+
+if __name__ == "__main__":
+    import geopandas as gpd
+
+    fcc_agg = export_data("../data/FCC_broadband_IL.csv", "../data/fcc_data_agg.csv")
 
-export_data("../data/FCC_broadband_IL.csv", "../data/fcc_data_agg.csv")
+    boundaries = gpd.read_file("../data/tl_2020_17_tract20/tl_2020_17_tract20.shp")
+    cells = tract_cells(boundaries, "../data/tract_h3_res8.csv")
+    aggregate_tracts(fcc_agg, cells).to_csv("../data/fcc_data_tract.csv", index=False)
@@ -2,6 +2,7 @@
 This script cleans the data from the libraries scraped from L2 website
 """
 import json
+import sys
 
 # Define initial arguments
 LIB_CODES = {
@@ -17,18 +18,19 @@ LIB_CODES = {
 
 
 # Define functions that load the data and clean the records
-def load_data(lib_type):
+def load_data(lib_type, data_path="../data/"):
     """
     Load the data to be cleaned
 
     Input:
         lib_type (str): a str containing the code of the type of libraries
+        data_path (str): directory with the scraped data
 
     Output:
         data (dict): dictionary with libraries names as keys and addresses as
             values
     """
-    file_name = "../data/lib_data_" + LIB_CODES[lib_type] + ".json"
+    file_name = data_path + "lib_data_" + LIB_CODES[lib_type] + ".json"
     with open(file_name) as file:
         data = json.load(file)
 
@@ -68,19 +70,35 @@ def clean_dataset(data_dict):
     return clean_data
 
 
+def export_clean_data(lib_code, data_path="../data/"):
+    """
+    Cleans the scraped libraries of one type and saves them as a json file
+    (`clean_lib_data_xxx.json`).
+
+    Input:
+        lib_code (str): a str containing the code of the type of libraries
+        data_path (str): directory with the scraped data, where the clean
+            data is saved
+    """
+    ini_data = load_data(lib_code, data_path)
+    new_data = clean_dataset(ini_data)
+
+    # Exports the dataset
+    file_name = data_path + "clean_lib_data_" + LIB_CODES[lib_code] + ".json"
+    with open(file_name, "w", encoding="utf-8") as f:
+        json.dump(new_data, f, ensure_ascii=False, indent=4)
+
+
 if __name__ == "__main__":
-    # Initial statements
-    print("Enter the library type code to clean corresponsing dataset:")
-    lib_code = input()
+    # The library type code can be passed as an argument or in the console
+    if len(sys.argv) > 1:
+        lib_code = sys.argv[1]
+    else:
+        print("Enter the library type code to clean corresponsing dataset:")
+        lib_code = input()
 
     # If digit string represents an integer, cleans the data
     if lib_code.isdigit() and lib_code in LIB_CODES:
-        ini_data = load_data(lib_code)
-        new_data = clean_dataset(ini_data)
-
-        # Exports the dataset
-        file_name = "../data/clean_lib_data_" + LIB_CODES[lib_code] + ".json"
-        with open(file_name, "w", encoding="utf-8") as f:
-            json.dump(new_data, f, ensure_ascii=False, indent=4)
+        export_clean_data(lib_code)
     else:
         print("Please enter a valid library code.")
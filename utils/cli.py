@@ -0,0 +1,306 @@
+"""
+Command Line Interface
+
+This script runs every step of the project from a single entry point, without
+prompts. Each subcommand imports the modules it needs when it runs, so light
+commands (e.g. `codes`) start without loading pandas, geopandas, h3 or
+googlemaps, and the modules can be imported elsewhere without side effects.
+
+The script should be run from the `utils/` folder, e.g.:
+
+    python cli.py scrape 124
+    python cli.py --http-mode replay acs --year 2021
+    python cli.py agg-fcc --mode sketch --tracts
+"""
+
+import argparse
+import sys
+
+# clean_lib_data only depends on the standard library
+from clean_lib_data import LIB_CODES
+
+DATA_PATH = "../data/"
+
+
+def run_codes(args):
+    """
+    Prints the library type codes.
+    """
+    for code, name in LIB_CODES.items():
+        print(f"{code}: {name}")
+
+
+def run_acs(args):
+    """
+    Retrieves ACS data for Illinois.
+    """
+    from acs_pull import export_acs
+
+    export_acs(args.year, DATA_PATH)
+
+
+def run_fcc(args):
+    """
+    Retrieves the FCC data for a state, edition and snapshot.
+    """
+    from constants import FCC_TOKEN
+    from fcc_pull import USBroadbandMapAPI
+
+    fcc_api = USBroadbandMapAPI(FCC_TOKEN)
+    fcc_api.get_data(
+        state_abb=args.state,
+        edition=args.edition,
+        snapshot=args.snapshot,
+        extraction_path=DATA_PATH,
+    )
+
+
+def run_agg_fcc(args):
+    """
+    Aggregates the FCC data by hexagon and, optionally, by census tract.
+    """
+    from agg_fcc_data import aggregate_tracts, export_data, tract_cells
+
+    fcc_agg = export_data(
+        args.in_path,
+        args.out_path,
+        args.mode,
+        args.sketch_path,
+        args.sketch_mode,
+        args.hll_p,
+    )
+
+    if args.check:
+        import fcc_sketches
+
+        state = fcc_sketches.load_sketch(args.sketch_path)
+        summary = fcc_sketches.check_file(args.in_path, state)
+        print(summary.to_string())
+        if not summary["within_bound"]:
+            sys.exit("The sketch error is larger than the documented bound")
+
+    if args.tracts:
+        import geopandas as gpd
+
+        boundaries = gpd.read_file(
+            DATA_PATH + "tl_2020_17_tract20/tl_2020_17_tract20.shp"
+        )
+        cells = tract_cells(boundaries, DATA_PATH + "tract_h3_res8.csv")
+        aggregate_tracts(fcc_agg, cells).to_csv(
+            DATA_PATH + "fcc_data_tract.csv", index=False
+        )
+
+
+def run_tracts_json(args):
+    """
+    Converts the census tracts shapefile to json.
+    """
+    from load_census_tracts import create_census_json
+
+    create_census_json()
+
+
+def run_scrape(args):
+    """
+    Scrapes the libraries of one type.
+    """
+    from scraping_libraries import export_scraped_data
+
+    export_scraped_data(args.lib_code, DATA_PATH)
+
+
+def run_clean(args):
+    """
+    Cleans the scraped libraries of one type.
+    """
+    from clean_lib_data import export_clean_data
+
+    export_clean_data(args.lib_code, DATA_PATH)
+
+
+def run_geocode(args):
+    """
+    Geocodes the clean libraries of one type.
+    """
+    from geocoding_libs import export_geocoded_data
+
+    export_geocoded_data(args.lib_code, DATA_PATH)
+
+
+def run_pipeline(args):
+    """
+    Scrapes, cleans and geocodes the libraries of one type in a single pass.
+    """
+    from lib_pipeline import export_streamed_data
+
+    num_libs = export_streamed_data(args.lib_code, DATA_PATH, args.checkpoint)
+    print(f"{num_libs} libraries saved")
+
+
+def run_store_fcc(args):
+    """
+    Stores a FCC snapshot in the history.
+    """
+    from fcc_history import store_fcc_snapshot
+
+    store_fcc_snapshot(args.in_path, args.edition, args.snapshot)
+
+
+def run_store_acs(args):
+    """
+    Stores an ACS vintage in the history.
+    """
+    from fcc_history import store_acs_vintage
+
+    store_acs_vintage(args.in_path, args.year)
+
+
+def run_diff_fcc(args):
+    """
+    Compares two FCC snapshots of the history.
+    """
+    from fcc_history import diff_fcc_snapshots
+
+    old = {"edition": args.old[0], "snapshot": args.old[1]}
+    new = {"edition": args.new[0], "snapshot": args.new[1]}
+    diff_fcc_snapshots(old, new).to_csv(args.out_path, index=False)
+
+
+def run_diff_acs(args):
+    """
+    Compares two ACS vintages of the history.
+    """
+    from fcc_history import diff_acs_vintages
+
+    diff_acs_vintages(args.old_year, args.new_year).to_csv(args.out_path, index=False)
+
+
+def build_parser():
+    """
+    Builds the parser of the command line arguments.
+
+    Output:
+        parser (argparse.ArgumentParser): the parser with all the subcommands
+    """
+    parser = argparse.ArgumentParser(
+        description="Illinois public libraries' internet access data pipeline"
+    )
+    parser.add_argument(
+        "--http-mode",
+        choices=["live", "record", "replay", "cache"],
+        help="how HTTP requests are handled (see http_client.py)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sub = subparsers.add_parser("codes", help="list the library type codes")
+    sub.set_defaults(func=run_codes)
+
+    sub = subparsers.add_parser("acs", help="retrieve ACS data")
+    sub.add_argument("--year", type=int, default=2021)
+    sub.set_defaults(func=run_acs)
+
+    sub = subparsers.add_parser("fcc", help="retrieve FCC data")
+    sub.add_argument("--state", default="IL")
+    sub.add_argument("--edition", default="20221231")
+    sub.add_argument("--snapshot", default="20230926")
+    sub.set_defaults(func=run_fcc)
+
+    sub = subparsers.add_parser("agg-fcc", help="aggregate FCC data by hexagon")
+    sub.add_argument("--in", dest="in_path", default=DATA_PATH + "FCC_broadband_IL.csv")
+    sub.add_argument("--out", dest="out_path", default=DATA_PATH + "fcc_data_agg.csv")
+    sub.add_argument("--mode", choices=["exact", "sketch"], default="exact")
+    sub.add_argument("--sketch-path", help="where to save the sketch state")
+    sub.add_argument(
+        "--sketch-mode",
+        choices=["auto", "bitset", "hll"],
+        default="auto",
+        help="how the providers are stored in the sketch (see fcc_sketches.py)",
+    )
+    sub.add_argument(
+        "--hll-p", type=int, default=8, help="bits of the HyperLogLog registers"
+    )
+    sub.add_argument(
+        "--check",
+        action="store_true",
+        help="check the sketch against the exact number of providers",
+    )
+    sub.add_argument(
+        "--tracts", action="store_true", help="also aggregate by census tract"
+    )
+    sub.set_defaults(func=run_agg_fcc)
+
+    sub = subparsers.add_parser("tracts-json", help="convert census tracts to json")
+    sub.set_defaults(func=run_tracts_json)
+
+    for name, func, text in [
+        ("scrape", run_scrape, "scrape libraries"),
+        ("clean", run_clean, "clean scraped libraries"),
+        ("geocode", run_geocode, "geocode clean libraries"),
+        ("pipeline", run_pipeline, "scrape, clean and geocode libraries"),
+    ]:
+        sub = subparsers.add_parser(name, help=text)
+        sub.add_argument(
+            "lib_code", choices=[code for code in LIB_CODES if code.isdigit()]
+        )
+        if name == "pipeline":
+            sub.add_argument(
+                "--checkpoint",
+                action="store_true",
+                help="also save the scraped records as JSON Lines",
+            )
+        sub.set_defaults(func=func)
+
+    sub = subparsers.add_parser("store-fcc", help="store a FCC snapshot in the history")
+    sub.add_argument("--in", dest="in_path", default=DATA_PATH + "FCC_broadband_IL.csv")
+    sub.add_argument("--edition", required=True)
+    sub.add_argument("--snapshot", required=True)
+    sub.set_defaults(func=run_store_fcc)
+
+    sub = subparsers.add_parser("store-acs", help="store an ACS vintage in the history")
+    sub.add_argument("--in", dest="in_path", default=DATA_PATH + "acs_internet_use.csv")
+    sub.add_argument("--year", type=int, required=True)
+    sub.set_defaults(func=run_store_acs)
+
+    sub = subparsers.add_parser("diff-fcc", help="compare two FCC snapshots")
+    sub.add_argument("--old", nargs=2, metavar=("EDITION", "SNAPSHOT"), required=True)
+    sub.add_argument("--new", nargs=2, metavar=("EDITION", "SNAPSHOT"), required=True)
+    sub.add_argument("--out", dest="out_path", default=DATA_PATH + "fcc_diff.csv")
+    sub.set_defaults(func=run_diff_fcc)
+
+    sub = subparsers.add_parser("diff-acs", help="compare two ACS vintages")
+    sub.add_argument("old_year", type=int)
+    sub.add_argument("new_year", type=int)
+    sub.add_argument("--out", dest="out_path", default=DATA_PATH + "acs_diff.csv")
+    sub.set_defaults(func=run_diff_acs)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Parses the arguments and runs the subcommand.
+
+    Input:
+        argv (lst): the arguments. If None, they are read from sys.argv
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if getattr(args, "tracts", False) and args.mode == "sketch":
+        parser.error("--tracts needs --mode exact (sketches have no location counts)")
+
+    if getattr(args, "check", False) and (
+        args.mode != "sketch" or args.sketch_path is None
+    ):
+        parser.error("--check needs --mode sketch and --sketch-path")
+
+    if args.http_mode is not None:
+        import http_client
+
+        http_client.set_mode(args.http_mode)
+
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
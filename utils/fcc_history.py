@@ -0,0 +1,332 @@
+"""
+History of FCC Snapshots and ACS Vintages
+
+This code keeps every FCC snapshot and ACS vintage in a partitioned folder
+structure (e.g. `fcc/edition=20221231/snapshot=20230926/`) and computes the
+changes between releases: providers added or lost per hexagon, speed changes,
+and census tract share deltas.
+
+Each hexagon stored in a snapshot carries a digest of its raw FCC records. When
+a new snapshot is stored, only the hexagons whose digest changed are
+re-aggregated; the rest are copied from the previous snapshot.
+"""
+
+import os
+
+import pandas as pd
+
+from load_data import add_share_columns
+
+HISTORY_PATH = "../data/history/"
+FCC_FILE = "fcc_data_agg.csv"
+ACS_FILE = "acs_internet_use.csv"
+
+# Columns of the raw FCC data that define the content of a hexagon
+FCC_COLS = [
+    "h3_res8_id",
+    "brand_name",
+    "max_advertised_download_speed",
+    "max_advertised_upload_speed",
+]
+SHARE_COLS = [
+    "share_broadband",
+    "share_cellular",
+    "share_satellite",
+    "share_no_internet",
+]
+
+
+def partition_path(dataset: str, **keys) -> str:
+    """
+    Builds the folder of a partition. Keys are written in the given order as
+    `key=value` folders.
+
+    Args:
+        dataset: name of the dataset ("fcc" or "acs")
+        keys: partition keys and values, e.g. edition="20221231"
+
+    Returns:
+        path: a str with the folder of the partition
+    """
+    parts = [f"{key}={value}" for key, value in keys.items()]
+
+    return os.path.join(HISTORY_PATH, dataset, *parts)
+
+
+def list_partitions(dataset: str) -> list:
+    """
+    Lists the stored partitions of a dataset, sorted from oldest to newest.
+
+    Args:
+        dataset: name of the dataset ("fcc" or "acs")
+
+    Returns:
+        partitions: a list of dicts with the partition keys and values
+    """
+    root = os.path.join(HISTORY_PATH, dataset)
+    partitions = []
+
+    for folder, subfolders, files in os.walk(root):
+        if subfolders or not files:
+            continue
+        rel_path = os.path.relpath(folder, root)
+        keys = dict(part.split("=", 1) for part in rel_path.split(os.sep))
+        partitions.append(keys)
+
+    return sorted(partitions, key=lambda keys: tuple(keys.values()))
+
+
+def hex_digests(df: pd.DataFrame) -> pd.Series:
+    """
+    Computes a digest of the raw FCC records of each hexagon. The digest does
+    not depend on the order of the records.
+
+    Args:
+        df: a pd.DataFrame with FCC's records
+
+    Returns:
+        digests: a pd.Series of uint64 indexed by h3_res8_id
+    """
+    row_hashes = pd.util.hash_pandas_object(df.loc[:, FCC_COLS], index=False)
+
+    return row_hashes.groupby(df.loc[:, "h3_res8_id"].values).sum()
+
+
+def aggregate_snapshot(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates FCC's records by hexagon, keeping the list of providers so that
+    snapshots can be compared.
+
+    Args:
+        df: a pd.DataFrame with FCC's records
+
+    Returns:
+        df_agg: a pd.DataFrame with one row per hexagon
+    """
+    # Imported here so the ACS functions do not load h3 and shapely
+    from agg_fcc_data import aggregate_hexes
+
+    df_agg = aggregate_hexes(df)
+
+    providers = (
+        df.groupby("h3_res8_id")["brand_name"]
+        .agg(lambda names: "|".join(sorted(set(names.dropna().astype(str)))))
+        .rename("providers")
+    )
+
+    return df_agg.merge(providers, on="h3_res8_id", how="left")
+
+
+def load_fcc_snapshot(edition: str, snapshot: str) -> pd.DataFrame:
+    """
+    Loads a stored FCC snapshot.
+
+    Args:
+        edition: edition in YYYYMMDD format
+        snapshot: snapshot in YYYYMMDD format
+
+    Returns:
+        df: a pd.DataFrame with one row per hexagon, sorted by h3_res8_id
+    """
+    folder = partition_path("fcc", edition=edition, snapshot=snapshot)
+
+    df = pd.read_csv(
+        os.path.join(folder, FCC_FILE), dtype={"digest": "uint64", "providers": str}
+    )
+    df.loc[:, "providers"] = df.loc[:, "providers"].fillna("")
+
+    return df
+
+
+def store_fcc_snapshot(
+    in_path: str, edition: str, snapshot: str, prev: dict = None
+) -> pd.DataFrame:
+    """
+    Stores the aggregated data of a FCC snapshot in its partition. Only the
+    hexagons that changed with respect to the previous snapshot are
+    re-aggregated.
+
+    Args:
+        in_path: path to the csv file with FCC's raw data for the snapshot
+        edition: edition in YYYYMMDD format
+        snapshot: snapshot in YYYYMMDD format
+        prev: keys of the snapshot to compare against. If None, the latest
+            stored snapshot older than the new one is used
+
+    Returns:
+        df_agg: the stored pd.DataFrame
+    """
+    df = pd.read_csv(in_path, index_col=False, usecols=FCC_COLS)
+    digests = hex_digests(df).rename("digest")
+
+    if prev is None:
+        older = [
+            keys
+            for keys in list_partitions("fcc")
+            if (keys["edition"], keys["snapshot"]) < (edition, snapshot)
+        ]
+        prev = older[-1] if older else None
+
+    if prev is None:
+        df_agg = aggregate_snapshot(df)
+    else:
+        prev_agg = load_fcc_snapshot(prev["edition"], prev["snapshot"])
+
+        # Hexagons whose records did not change keep their previous aggregates
+        unchanged = pd.merge(
+            prev_agg.loc[:, ["h3_res8_id", "digest"]],
+            digests.rename_axis("h3_res8_id").reset_index(),
+            on=["h3_res8_id", "digest"],
+        ).loc[:, "h3_res8_id"]
+        changed_rows = ~df.loc[:, "h3_res8_id"].isin(unchanged)
+
+        df_agg = pd.concat(
+            [
+                prev_agg.loc[prev_agg.loc[:, "h3_res8_id"].isin(unchanged)],
+                aggregate_snapshot(df.loc[changed_rows]),
+            ],
+            ignore_index=True,
+        )
+        df_agg.drop(columns="digest", inplace=True)
+
+    df_agg = df_agg.merge(digests, left_on="h3_res8_id", right_index=True)
+    df_agg = df_agg.sort_values("h3_res8_id", ignore_index=True)
+
+    folder = partition_path("fcc", edition=edition, snapshot=snapshot)
+    os.makedirs(folder, exist_ok=True)
+    df_agg.to_csv(os.path.join(folder, FCC_FILE), index=False)
+
+    return df_agg
+
+
+def diff_fcc_snapshots(old: dict, new: dict) -> pd.DataFrame:
+    """
+    Compares two stored FCC snapshots. Both snapshots are sorted by
+    h3_res8_id, so the comparison is a key-sorted merge and only hexagons with
+    different digests are reported.
+
+    Args:
+        old: keys of the old snapshot, e.g. {"edition": ..., "snapshot": ...}
+        new: keys of the new snapshot
+
+    Returns:
+        diff: a pd.DataFrame with one row per changed hexagon. `status` is
+            "added", "removed" or "changed"
+    """
+    old_df = load_fcc_snapshot(old["edition"], old["snapshot"])
+    new_df = load_fcc_snapshot(new["edition"], new["snapshot"])
+
+    # Digests are compared as str since missing values would cast them to float
+    old_df = old_df.astype({"digest": str})
+    new_df = new_df.astype({"digest": str})
+
+    diff = pd.merge(
+        old_df,
+        new_df,
+        on="h3_res8_id",
+        how="outer",
+        sort=True,
+        suffixes=("_old", "_new"),
+        indicator="status",
+    )
+    diff = diff.loc[diff.loc[:, "digest_old"] != diff.loc[:, "digest_new"]].copy()
+    diff["status"] = diff.loc[:, "status"].astype(str).map(
+        {"left_only": "removed", "right_only": "added", "both": "changed"}
+    )
+
+    old_providers = diff.loc[:, "providers_old"].fillna("").str.split("|")
+    new_providers = diff.loc[:, "providers_new"].fillna("").str.split("|")
+    diff.loc[:, "providers_added"] = [
+        "|".join(sorted(set(n) - set(o) - {""}))
+        for o, n in zip(old_providers, new_providers)
+    ]
+    diff.loc[:, "providers_lost"] = [
+        "|".join(sorted(set(o) - set(n) - {""}))
+        for o, n in zip(old_providers, new_providers)
+    ]
+
+    # A missing side has no providers, but its speeds are unknown (NaN delta)
+    new_providers = diff.loc[:, "avg_num_providers_new"].fillna(0)
+    old_providers = diff.loc[:, "avg_num_providers_old"].fillna(0)
+    diff.loc[:, "avg_num_providers_delta"] = new_providers - old_providers
+
+    for var in ["avg_max_down_speed", "avg_max_up_speed"]:
+        new_values = diff.loc[:, var + "_new"]
+        old_values = diff.loc[:, var + "_old"]
+        diff.loc[:, var + "_delta"] = new_values - old_values
+
+    cols = [
+        "h3_res8_id",
+        "status",
+        "providers_added",
+        "providers_lost",
+        "avg_num_providers_delta",
+        "avg_max_down_speed_old",
+        "avg_max_down_speed_new",
+        "avg_max_down_speed_delta",
+        "avg_max_up_speed_old",
+        "avg_max_up_speed_new",
+        "avg_max_up_speed_delta",
+    ]
+
+    return diff.loc[:, cols].reset_index(drop=True)
+
+
+def store_acs_vintage(in_path: str, year: int) -> pd.DataFrame:
+    """
+    Stores ACS data of a given year in its partition.
+
+    Args:
+        in_path: path to the csv file created by `acs_pull.py`
+        year: ACS 5-year estimates vintage
+
+    Returns:
+        acs_df: the stored pd.DataFrame
+    """
+    acs_df = pd.read_csv(in_path, dtype={"GEOID20": str})
+    acs_df = acs_df.sort_values("GEOID20", ignore_index=True)
+
+    folder = partition_path("acs", year=year)
+    os.makedirs(folder, exist_ok=True)
+    acs_df.to_csv(os.path.join(folder, ACS_FILE), index=False)
+
+    return acs_df
+
+
+def diff_acs_vintages(old_year: int, new_year: int) -> pd.DataFrame:
+    """
+    Computes the change in the broadband access variables of each census tract
+    between two stored ACS vintages.
+
+    Args:
+        old_year: year of the old vintage
+        new_year: year of the new vintage
+
+    Returns:
+        diff: a pd.DataFrame with the old and new shares, and their difference,
+            by GEOID20
+    """
+    shares = []
+    for year in [old_year, new_year]:
+        folder = partition_path("acs", year=year)
+        acs_df = pd.read_csv(os.path.join(folder, ACS_FILE), dtype={"GEOID20": str})
+        shares.append(add_share_columns(acs_df).loc[:, ["GEOID20"] + SHARE_COLS])
+
+    diff = pd.merge(
+        shares[0], shares[1], on="GEOID20", how="outer", sort=True,
+        suffixes=("_old", "_new"),
+    )
+    for var in SHARE_COLS:
+        diff.loc[:, var + "_delta"] = diff.loc[:, var + "_new"] - diff.loc[:, var + "_old"]
+
+    return diff
+
+
+# -------------------------------
+# Storing the current FCC snapshot and ACS vintage
+
+if __name__ == "__main__":
+    store_fcc_snapshot(
+        "../data/FCC_broadband_IL.csv", edition="20221231", snapshot="20230926"
+    )
+    store_acs_vintage("../data/acs_internet_use.csv", year=2021)
@@ -1,10 +1,9 @@
 # Retrieve data from the US National Broadband map using Virginia Tech API
 
-import requests
 import pandas as pd
 from io import BytesIO
 import zipfile
-from constants import FCC_TOKEN
+import http_client
 import os
 
 # API class
@@ -48,9 +47,9 @@ class USBroadbandMapAPI:
 
         full_url = f"{self.base_url}state_usps={state_abb}&edition={edition}&snapshot={snapshot}"
 
-        response = requests.get(full_url, params={"api_key": self.token})
+        response = http_client.get(full_url, params={"api_key": self.token})
 
-        if response == 200:
+        if response.status_code == 200:
             # Use BytesIO to create a file-like object from the response content
             zip_file = zipfile.ZipFile(BytesIO(response.content))
 
@@ -62,8 +61,11 @@ class USBroadbandMapAPI:
 
 # API call
 
-fcc_api = USBroadbandMapAPI(FCC_TOKEN)
+if __name__ == "__main__":
+    from constants import FCC_TOKEN
 
-fcc_api.get_data(
-    state_abb="IL", edition="20221231", snapshot="20230926", extraction_path="../data"
-)
+    fcc_api = USBroadbandMapAPI(FCC_TOKEN)
+
+    fcc_api.get_data(
+        state_abb="IL", edition="20221231", snapshot="20230926", extraction_path="../data"
+    )
@@ -0,0 +1,446 @@
+"""
+Mergeable Sketches of FCC's Broadband Data
+
+This code aggregates FCC's broadband data by hexagon into partial states that
+can be merged across files, chunks, states, snapshots and H3 resolutions
+without reading the raw records again.
+
+Each state has one row per hexagon with:
+    - sum and count of the advertised download and upload speeds
+    - the set of providers, stored as one of:
+        - "bitset": a bit per provider, using the positions kept in the
+          providers registry (`data/providers.json`). Counts are exact.
+        - "hll": a HyperLogLog sketch with 2**p registers (p is stored in the
+          `hll_p` column). The relative standard error of the number of
+          providers is 1.04 / sqrt(2**p) (6.5% for the default p=8). Small
+          counts are estimated with linear counting, which is close to the
+          exact count but not an integer (e.g. 3.02 for 3 providers).
+
+The mode of a state is given by its provider column. Bitset states are
+converted to HyperLogLog when they are merged with HyperLogLog states.
+
+`compare_with_exact` compares the estimates with the exact number of providers.
+"""
+
+import json
+import os
+
+import h3
+import numpy as np
+import pandas as pd
+
+REGISTRY_PATH = "../data/providers.json"
+HLL_P = 8
+BITSET_MAX = 1024
+CHUNK_SIZE = 1_000_000
+
+SPEED_COLS = {
+    "max_advertised_download_speed": "down",
+    "max_advertised_upload_speed": "up",
+}
+
+
+def provider_positions(names, registry_path=REGISTRY_PATH) -> pd.Series:
+    """
+    Returns the position of each provider in the registry. New providers are
+    added at the end, so positions never change and bitsets built at different
+    times can be merged.
+
+    Args:
+        names: iterable with provider names
+        registry_path: path to the json file with the providers registry
+
+    Returns:
+        positions: a pd.Series with the positions indexed by provider name
+    """
+    registry = []
+    if os.path.exists(registry_path):
+        with open(registry_path) as file:
+            registry = json.load(file)
+
+    known = set(registry)
+    new_names = sorted(set(names) - known)
+    if new_names:
+        registry.extend(new_names)
+        with open(registry_path, "w", encoding="utf-8") as file:
+            json.dump(registry, file, ensure_ascii=False, indent=4)
+
+    return pd.Series(range(len(registry)), index=registry)
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """
+    Number of bits needed to represent each uint64 value.
+    """
+    values = values.copy()
+    lengths = np.zeros(len(values), dtype=np.uint8)
+    for shift in [32, 16, 8, 4, 2, 1]:
+        big = values >= (np.uint64(1) << np.uint64(shift))
+        lengths[big] += shift
+        values[big] >>= np.uint64(shift)
+    lengths[values > 0] += 1
+
+    return lengths
+
+
+def hll_registers(names: pd.Series, p: int = HLL_P) -> pd.DataFrame:
+    """
+    Computes the HyperLogLog register and rank of each provider name.
+
+    Args:
+        names: a pd.Series with provider names
+        p: number of bits used to choose the register
+
+    Returns:
+        registers: a pd.DataFrame with columns register and rank
+    """
+    hashes = pd.util.hash_array(names.astype(str).to_numpy(dtype=object))
+    width = np.uint64(64 - p)
+    register = hashes >> width
+    rest = hashes & ((np.uint64(1) << width) - np.uint64(1))
+    rank = (64 - p) - _bit_length(rest).astype(int) + 1
+
+    return pd.DataFrame(
+        {"register": register.astype(int), "rank": rank}, index=names.index
+    )
+
+
+def _encode_hll(registers: dict) -> str:
+    """
+    Encodes the non-empty registers of a sketch as "register:rank" pairs.
+    """
+    return ",".join(f"{reg}:{rank}" for reg, rank in sorted(registers.items()))
+
+
+def _decode_hll(sketch: str) -> dict:
+    """
+    Decodes the registers of a sketch encoded with `_encode_hll`.
+    """
+    if not sketch:
+        return {}
+    pairs = (pair.split(":") for pair in sketch.split(","))
+
+    return {int(reg): int(rank) for reg, rank in pairs}
+
+
+def hll_estimate(sketch: str, p: int = HLL_P) -> float:
+    """
+    Estimates the number of distinct values in a HyperLogLog sketch.
+
+    Args:
+        sketch: registers encoded with `_encode_hll`
+        p: number of bits used to choose the register
+
+    Returns:
+        estimate: the estimated number of distinct values
+    """
+    m = 2**p
+    registers = _decode_hll(sketch)
+    num_zeros = m - len(registers)
+
+    alpha = 0.7213 / (1 + 1.079 / m)
+    harmonic = num_zeros + sum(2.0 ** -rank for rank in registers.values())
+    estimate = alpha * m * m / harmonic
+
+    # Small range correction (linear counting)
+    if estimate <= 2.5 * m and num_zeros > 0:
+        estimate = m * np.log(m / num_zeros)
+
+    return estimate
+
+
+def sketch_hexes(
+    df: pd.DataFrame, mode: str = "auto", p: int = HLL_P, registry_path=REGISTRY_PATH
+) -> pd.DataFrame:
+    """
+    Builds the partial state of FCC's records by hexagon.
+
+    Args:
+        df: a pd.DataFrame with FCC's records (one row per location and provider)
+        mode: "bitset", "hll", or "auto" to use bitsets while the providers
+            registry has at most BITSET_MAX providers
+        p: number of bits used to choose the register in "hll" mode
+        registry_path: path to the json file with the providers registry
+
+    Returns:
+        state: a pd.DataFrame with one row per hexagon (h3_id)
+    """
+    assert mode in ["auto", "bitset", "hll"], "mode should be auto, bitset or hll"
+
+    groups = df.groupby("h3_res8_id")
+    state = pd.DataFrame(index=groups.size().index)
+
+    for col, name in SPEED_COLS.items():
+        state.loc[:, name + "_sum"] = groups[col].sum()
+        state.loc[:, name + "_count"] = groups[col].count()
+
+    # Records without provider only count for the speeds
+    brands = df.loc[df.loc[:, "brand_name"].notna(), ["h3_res8_id", "brand_name"]]
+    brand_names = brands.loc[:, "brand_name"].astype(str)
+
+    # The registry is only needed (and updated) for bitsets
+    if mode in ["auto", "bitset"]:
+        positions = provider_positions(brand_names, registry_path)
+        if mode == "auto":
+            mode = "bitset" if len(positions) <= BITSET_MAX else "hll"
+
+    if mode == "bitset":
+        pos = brand_names.map(positions)
+        bitsets = {
+            h3_id: hex(sum(1 << int(value) for value in set(values)))
+            for h3_id, values in pos.groupby(brands.loc[:, "h3_res8_id"])
+        }
+        state["providers_bitset"] = [bitsets.get(h3_id, "0x0") for h3_id in state.index]
+    else:
+        regs = hll_registers(brand_names, p)
+        regs.loc[:, "h3_res8_id"] = brands.loc[:, "h3_res8_id"]
+        regs = regs.groupby(["h3_res8_id", "register"])["rank"].max().reset_index()
+        # A chunk without any provider gives no registers (empty sketches)
+        sketches = {
+            h3_id: _encode_hll(dict(zip(group["register"], group["rank"])))
+            for h3_id, group in regs.groupby("h3_res8_id")
+        }
+        state["providers_hll"] = [sketches.get(h3_id, "") for h3_id in state.index]
+        state["hll_p"] = p
+
+    return state.rename_axis("h3_id").reset_index()
+
+
+def _merge_bitsets(values: pd.Series) -> str:
+    """
+    Merges the provider bitsets of several partial states of one hexagon.
+    """
+    bits = 0
+    for value in values:
+        bits |= int(value, 16)
+
+    return hex(bits)
+
+
+def _merge_hll(values: pd.Series) -> str:
+    """
+    Merges the HyperLogLog sketches of several partial states of one hexagon.
+    """
+    registers = {}
+    for value in values:
+        for reg, rank in _decode_hll(value).items():
+            registers[reg] = max(rank, registers.get(reg, 0))
+
+    return _encode_hll(registers)
+
+
+def _state_p(state: pd.DataFrame) -> int:
+    """
+    Returns the p of a HyperLogLog state.
+    """
+    values = sorted(int(value) for value in state.loc[:, "hll_p"].unique())
+    if len(values) > 1:
+        raise ValueError(f"HyperLogLog states with different p: {values}")
+
+    return values[0] if values else HLL_P
+
+
+def bitset_to_hll(state: pd.DataFrame, p: int, registry_path=REGISTRY_PATH):
+    """
+    Converts a bitset state to a HyperLogLog state, using the providers
+    registry to recover the provider names of each bitset.
+
+    Args:
+        state: a pd.DataFrame with a providers_bitset column
+        p: number of bits used to choose the register
+        registry_path: path to the json file with the providers registry
+
+    Returns:
+        state: a pd.DataFrame with providers_hll and hll_p columns
+    """
+    with open(registry_path) as file:
+        registry = json.load(file)
+
+    sketches = []
+    for bits in state.loc[:, "providers_bitset"]:
+        bits = int(bits, 16)
+        names = [name for pos, name in enumerate(registry) if bits >> pos & 1]
+        regs = hll_registers(pd.Series(names, dtype=object), p)
+        registers = regs.groupby("register")["rank"].max()
+        sketches.append(_encode_hll(registers.to_dict()))
+
+    state = state.drop(columns="providers_bitset")
+    state["providers_hll"] = sketches
+    state["hll_p"] = p
+
+    return state
+
+
+def merge_sketches(states: list, res: int = None) -> pd.DataFrame:
+    """
+    Merges partial states. If some states are bitsets and others HyperLogLog,
+    the bitsets are converted to HyperLogLog first. HyperLogLog states must
+    have the same p.
+
+    Args:
+        states: list of pd.DataFrames created by `sketch_hexes` or
+            `merge_sketches`
+        res: if given, hexagons are merged into their parents at this H3
+            resolution (it should be coarser than the resolution of the states)
+
+    Returns:
+        state: the merged pd.DataFrame
+    """
+    hll_states = [state for state in states if "providers_hll" in state.columns]
+    if hll_states:
+        p = _state_p(pd.concat(hll_states, ignore_index=True))
+        states = [
+            bitset_to_hll(state, p) if "providers_bitset" in state.columns else state
+            for state in states
+        ]
+
+    state = pd.concat(states, ignore_index=True)
+
+    if res is not None:
+        state.loc[:, "h3_id"] = state.loc[:, "h3_id"].apply(
+            lambda h3_id: h3.h3_to_parent(h3_id, res)
+        )
+
+    agg_funcs = {col: "sum" for col in state.columns if col.endswith(("_sum", "_count"))}
+    if "providers_bitset" in state.columns:
+        agg_funcs["providers_bitset"] = _merge_bitsets
+    else:
+        agg_funcs["providers_hll"] = _merge_hll
+        agg_funcs["hll_p"] = "first"
+
+    return state.groupby("h3_id").agg(agg_funcs).reset_index()
+
+
+def finalize(state: pd.DataFrame) -> pd.DataFrame:
+    """
+    Computes the final aggregates of a partial state. The columns are the same
+    as the ones of the exact aggregation (`agg_fcc_data.aggregate_hexes`).
+
+    Args:
+        state: a pd.DataFrame created by `sketch_hexes` or `merge_sketches`
+
+    Returns:
+        df_agg: a pd.DataFrame with the number of providers and the average
+            advertised speeds by hexagon
+    """
+    if "providers_bitset" in state.columns:
+        num_providers = state.loc[:, "providers_bitset"].apply(
+            lambda bits: bin(int(bits, 16)).count("1")
+        )
+    else:
+        p = _state_p(state)
+        num_providers = state.loc[:, "providers_hll"].apply(
+            lambda sketch: hll_estimate(sketch, p)
+        )
+
+    res = h3.h3_get_resolution(state.loc[:, "h3_id"].iloc[0]) if len(state) else 8
+
+    df_agg = pd.DataFrame(
+        {
+            f"h3_res{res}_id": state.loc[:, "h3_id"],
+            "avg_num_providers": num_providers,
+            "avg_max_down_speed": state.loc[:, "down_sum"] / state.loc[:, "down_count"],
+            "avg_max_up_speed": state.loc[:, "up_sum"] / state.loc[:, "up_count"],
+        }
+    )
+
+    return df_agg
+
+
+def sketch_file(in_path: str, mode: str = "auto", p: int = HLL_P) -> pd.DataFrame:
+    """
+    Builds the partial state of a csv file with FCC's records, reading it in
+    chunks of CHUNK_SIZE rows.
+
+    Args:
+        in_path: path to the csv file with FCC's broadband data
+        mode: "bitset", "hll" or "auto"
+        p: number of bits used to choose the register in "hll" mode
+
+    Returns:
+        state: a pd.DataFrame with one row per hexagon
+    """
+    cols = ["h3_res8_id", "brand_name"] + list(SPEED_COLS)
+    chunks = pd.read_csv(in_path, index_col=False, usecols=cols, chunksize=CHUNK_SIZE)
+
+    state = None
+    for chunk in chunks:
+        chunk_state = sketch_hexes(chunk, mode, p)
+        if state is None:
+            # All chunks use the mode chosen for the first one
+            mode = "bitset" if "providers_bitset" in chunk_state.columns else "hll"
+            state = chunk_state
+        else:
+            state = merge_sketches([state, chunk_state])
+
+    return state
+
+
+def save_sketch(state: pd.DataFrame, path: str):
+    """
+    Saves a partial state as a csv file.
+    """
+    state.to_csv(path, index=False)
+
+
+def load_sketch(path: str) -> pd.DataFrame:
+    """
+    Loads a partial state saved with `save_sketch`.
+    """
+    state = pd.read_csv(path, dtype={"providers_bitset": str, "providers_hll": str})
+    if "providers_hll" in state.columns:
+        state.loc[:, "providers_hll"] = state.loc[:, "providers_hll"].fillna("")
+
+    return state
+
+
+def compare_with_exact(df: pd.DataFrame, state: pd.DataFrame) -> pd.Series:
+    """
+    Compares the number of providers estimated from a partial state with the
+    exact number of providers by hexagon (hexagons without providers are not
+    compared).
+
+    Args:
+        df: a pd.DataFrame with the FCC's records used to build the state
+        state: a pd.DataFrame created by `sketch_hexes` or `merge_sketches`
+
+    Returns:
+        summary: a pd.Series with the mean and maximum relative error, the
+            expected relative standard error of the mode, and whether the mean
+            relative error is within it
+    """
+    exact = df.groupby("h3_res8_id")["brand_name"].nunique()
+    exact = exact.loc[exact > 0]
+    estimate = finalize(state).set_index("h3_res8_id")["avg_num_providers"]
+    rel_error = (estimate.reindex(exact.index) - exact).abs() / exact
+
+    if "providers_bitset" in state.columns:
+        expected = 0
+    else:
+        expected = 1.04 / np.sqrt(2 ** _state_p(state))
+
+    return pd.Series(
+        {
+            "mean_rel_error": rel_error.mean(),
+            "max_rel_error": rel_error.max(),
+            "expected_std_error": expected,
+            "within_bound": bool(rel_error.mean() <= expected),
+        }
+    )
+
+
+def check_file(in_path: str, state: pd.DataFrame) -> pd.Series:
+    """
+    Checks a partial state built with `sketch_file` against the exact number
+    of providers computed from the same csv file.
+
+    Args:
+        in_path: path to the csv file with FCC's broadband data
+        state: a pd.DataFrame created by `sketch_file`
+
+    Returns:
+        summary: a pd.Series as returned by `compare_with_exact`
+    """
+    df = pd.read_csv(in_path, index_col=False, usecols=["h3_res8_id", "brand_name"])
+
+    return compare_with_exact(df, state)
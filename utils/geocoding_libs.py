@@ -1,8 +1,7 @@
-import googlemaps
+import sys
 import pandas as pd
 import json
 from datetime import datetime
-from constants import GEOCODING_API_KEY
 
 # Define initial arguments
 LIB_CODES = {
@@ -17,24 +16,69 @@ LIB_CODES = {
 }
 
 
-def load_data(lib_type):
+def load_data(lib_type, data_path="../data/"):
     """
     Load the dataset with libraries names and addresses
 
     Input:
         lib_type (str): a str containing the code of the type of library
+        data_path (str): directory with the clean data
 
     Output:
         data (dict): dictionary with names as keys and addresses as values
     """
-    file_name = "../data/clean_lib_data_" + LIB_CODES[lib_type] + ".json"
+    file_name = data_path + "clean_lib_data_" + LIB_CODES[lib_type] + ".json"
     with open(file_name) as file:
         data = json.load(file)
 
     return data
 
 
-def geocode_lib(lib_dict):
+def geocoding_client(api_key=None):
+    """
+    Establishes the connection with Google's georeferencing API. googlemaps
+    and constants.py are only imported here, so the module can be imported
+    without them.
+
+    Input:
+        api_key (str): the API key. If None, it is read from GEOCODING_API_KEY
+            in constants.py
+    Output:
+        gmaps (googlemaps.Client): a client connected to the API
+    """
+    import googlemaps
+
+    if api_key is None:
+        from constants import GEOCODING_API_KEY
+
+        api_key = GEOCODING_API_KEY
+
+    return googlemaps.Client(key=api_key)
+
+
+def geocode_address(gmaps, addr):
+    """
+    Retrieves the latitude longitude pair of one address using Google's
+    georeferencing API.
+
+    Input:
+        gmaps (googlemaps.Client): a client connected to the API
+        addr (str): the address to geocode
+    Output:
+        (lat, lon) (tuple): the coordinates of the address, or None if the
+            address was not found
+    """
+    # Geocode an address (returns a list with a dict as only element)
+    geocode_result = gmaps.geocode(addr)
+    if geocode_result:
+        # Extracting 'lat' and 'lng' from the 'location'
+        data = geocode_result[0]["geometry"]
+        return data["location"]["lat"], data["location"]["lng"]
+
+    return None
+
+
+def geocode_lib(lib_dict, api_key=None):
     """
     Takes an address and retrieves the latitude longitude pair using Google's
     georeferencing API. An API key is necesary to execute the command
@@ -42,12 +86,13 @@ def geocode_lib(lib_dict):
     Input:
         lib_dict (dict): A dictionary where keys are library names and values
             are lists of addresses.
+        api_key (str): the API key. If None, it is read from constants.py
     Output:
         df (DataFrame): A DataFrame with columns 'lib_name', 'latitude', and
             'longitude'.
     """
     # Establish connection with the API
-    gmaps = googlemaps.Client(key=GEOCODING_API_KEY)
+    gmaps = geocoding_client(api_key)
 
     # Define structures to store the results
     lib_name = []
@@ -58,13 +103,10 @@ def geocode_lib(lib_dict):
     for lib in lib_dict:
         lib_addrs = lib_dict[lib]
         for addr in lib_addrs:
-            # Geocode an address (returns a list with a dict as only element)
-            geocode_result = gmaps.geocode(addr)
-            if geocode_result:
-                # Extracting 'lat' and 'lng' from the 'location'
-                data = geocode_result[0]["geometry"]
-                lat.append(data["location"]["lat"])
-                lon.append(data["location"]["lng"])
+            coords = geocode_address(gmaps, addr)
+            if coords:
+                lat.append(coords[0])
+                lon.append(coords[1])
                 lib_name.append(lib)
                 lib_addr.append(addr)
 
@@ -85,18 +127,35 @@ def geocode_lib(lib_dict):
     return df
 
 
+def export_geocoded_data(lib_code, data_path="../data/", api_key=None):
+    """
+    Geocodes the clean libraries of one type and saves them as a csv file
+    (`geocoded_lib_data_xxx.csv`).
+
+    Input:
+        lib_code (str): a str containing the code of the type of library
+        data_path (str): directory with the clean data, where the geocoded
+            data is saved
+        api_key (str): the API key. If None, it is read from constants.py
+    """
+    ini_data = load_data(lib_code, data_path)
+    new_data = geocode_lib(ini_data, api_key)
+
+    # Exports the dataset
+    file_name = data_path + "geocoded_lib_data_" + LIB_CODES[lib_code] + ".csv"
+    new_data.to_csv(file_name, index=False)
+
+
 if __name__ == "__main__":
-    # Initial statements
-    print("Enter the library type code to obtain the data:")
-    lib_code = input()
+    # The library type code can be passed as an argument or in the console
+    if len(sys.argv) > 1:
+        lib_code = sys.argv[1]
+    else:
+        print("Enter the library type code to obtain the data:")
+        lib_code = input()
 
     # If digit string represents an integer, cleans the data
     if lib_code.isdigit() and lib_code in LIB_CODES:
-        ini_data = load_data(lib_code)
-        new_data = geocode_lib(ini_data)
-
-        # Exports the dataset
-        file_name = "../data/geocoded_lib_data_" + LIB_CODES[lib_code] + ".csv"
-        new_data.to_csv(file_name, index=False)
+        export_geocoded_data(lib_code)
     else:
         print("Please enter a valid library code.")
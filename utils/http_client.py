@@ -0,0 +1,192 @@
+"""
+Shared HTTP Layer
+
+This code defines the HTTP client used by the Census API, the US Broadband Map
+API and the libraries scraper. All requests go through a single session (with
+connection pooling, retries and a default timeout) and can be recorded to disk
+and replayed later without network access.
+
+Modes (set with the HTTP_MODE environment variable or `set_mode`):
+    - "live": requests always go to the network (default)
+    - "record": requests go to the network and responses are saved to disk
+    - "replay": responses are read from disk, and requests that were not
+      recorded raise an error
+    - "cache": responses are read from disk if recorded, otherwise they are
+      fetched and recorded
+"""
+
+import hashlib
+import json
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CACHE_PATH = os.environ.get("HTTP_CACHE_PATH", "../data/http_cache/")
+MODES = ["live", "record", "replay", "cache"]
+TIMEOUT = 30
+
+# Query parameters that are not used to identify a request, so that
+# recordings do not depend on (or contain) API keys
+SECRET_PARAMS = ["key", "api_key"]
+
+_mode = os.environ.get("HTTP_MODE", "live")
+_session = None
+
+
+def set_mode(mode):
+    """
+    Sets how requests are handled.
+
+    Input:
+        mode (str): one of "live", "record", "replay" or "cache"
+    """
+    global _mode
+
+    assert mode in MODES, f"mode should be one of {MODES}"
+    _mode = mode
+
+
+def get_session():
+    """
+    Returns the session shared by all the clients. It keeps connections alive
+    and retries requests that fail with server errors.
+
+    Output:
+        session (requests.Session): the shared session
+    """
+    global _session
+
+    if _session is None:
+        retries = Retry(
+            total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504]
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+        _session = requests.Session()
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+
+    return _session
+
+
+def public_url(url, params=None):
+    """
+    Builds the full url of a request without secret parameters. Query
+    parameters are sorted so that equivalent requests give the same url.
+
+    Input:
+        url (str): the url of the request
+        params (dict): query parameters of the request
+
+    Output:
+        url (str): the url without secret parameters
+    """
+    prepared = requests.Request("GET", url, params=params).prepare()
+    parsed = requests.utils.urlparse(prepared.url)
+    query = [
+        pair
+        for pair in parsed.query.split("&")
+        if pair and pair.split("=", 1)[0] not in SECRET_PARAMS
+    ]
+
+    return parsed._replace(query="&".join(sorted(query))).geturl()
+
+
+def request_key(url, params=None):
+    """
+    Computes the key that identifies a request in the cache.
+
+    Input:
+        url (str): the url of the request
+        params (dict): query parameters of the request
+
+    Output:
+        key (str): a sha256 hex digest
+    """
+    identity = public_url(url, params)
+
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def _cache_files(key):
+    """
+    Returns the paths of the body and metadata files of a cached response.
+    """
+    folder = os.path.join(CACHE_PATH, key[:2])
+
+    return os.path.join(folder, key + ".body"), os.path.join(folder, key + ".json")
+
+
+def _load_response(key):
+    """
+    Loads a recorded response, or returns None if it was not recorded.
+    """
+    body_file, meta_file = _cache_files(key)
+    if not os.path.exists(meta_file):
+        return None
+
+    with open(meta_file) as file:
+        meta = json.load(file)
+    with open(body_file, "rb") as file:
+        content = file.read()
+
+    response = requests.Response()
+    response.status_code = meta["status_code"]
+    response.headers.update(meta["headers"])
+    response.url = meta["url"]
+    response.encoding = meta["encoding"]
+    response._content = content
+
+    return response
+
+
+def _save_response(key, response):
+    """
+    Records a response. Only successful responses are recorded.
+    """
+    if not response.ok:
+        return
+
+    body_file, meta_file = _cache_files(key)
+    os.makedirs(os.path.dirname(body_file), exist_ok=True)
+
+    meta = {
+        "status_code": response.status_code,
+        "headers": dict(response.headers),
+        "url": public_url(response.url),
+        "encoding": response.encoding,
+    }
+    with open(body_file, "wb") as file:
+        file.write(response.content)
+    with open(meta_file, "w") as file:
+        json.dump(meta, file)
+
+
+def get(url, params=None, timeout=TIMEOUT):
+    """
+    Sends a GET request following the current mode.
+
+    Input:
+        url (str): the url of the request
+        params (dict): query parameters of the request
+        timeout (float): seconds to wait for the server
+
+    Output:
+        response (requests.Response): the response of the server
+    """
+    key = request_key(url, params)
+
+    if _mode in ["replay", "cache"]:
+        response = _load_response(key)
+        if response is not None:
+            return response
+        if _mode == "replay":
+            raise LookupError(f"No recorded response for {public_url(url, params)}")
+
+    response = get_session().get(url, params=params, timeout=timeout)
+
+    if _mode in ["record", "cache"]:
+        _save_response(key, response)
+
+    return response
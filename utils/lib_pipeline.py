@@ -0,0 +1,194 @@
+"""
+Streaming pipeline for the libraries data
+
+This script scrapes, cleans and geocodes the libraries in a single pass. The
+scraper runs in a separate thread and sends each clean record through a
+bounded queue, so geocoding starts while later pages are still being fetched
+and only a few records are held in memory at a time. The geocoded records are
+written to the csv file as they arrive.
+
+If checkpoints are requested, each scraped record is also appended to a JSON
+Lines file (`lib_records_xxx.jsonl`) as it arrives, with the library name and
+its raw and clean addresses, so the scraped data is kept if the run fails.
+"""
+
+import csv
+import json
+import queue
+import sys
+import threading
+from contextlib import closing
+
+from clean_lib_data import clean_library_record
+from geocoding_libs import geocode_address, geocoding_client
+from scraping_libraries import BASE_URL, LIB_CODES, iter_lib_records
+
+QUEUE_SIZE = 100
+# Seconds the scraper waits for space in the queue before checking if the
+# pipeline was stopped
+PUT_TIMEOUT = 1
+
+# Marks the end of the records in the queue
+_DONE = object()
+
+
+def iter_clean_records(url, lib_type, checkpoint=False, data_path="../data/"):
+    """
+    Scrapes the libraries of one type and yields their clean records.
+
+    Input:
+        url (str): a str that contains the base url of the website
+        lib_type (str): a str containing the code of the type of libraries
+        checkpoint (bool): if True, each record is also appended to
+            `lib_records_xxx.jsonl` as it is scraped
+        data_path (str): directory where the checkpoint file is saved
+
+    Output:
+        (lib_name, clean_addr) (tuple): a library name and one clean address
+    """
+    if not checkpoint:
+        for lib_name, lib_address in iter_lib_records(url, lib_type):
+            yield lib_name, clean_library_record(lib_address)
+        return
+
+    file_name = data_path + "lib_records_" + LIB_CODES[lib_type] + ".jsonl"
+    with open(file_name, "w", encoding="utf-8") as f:
+        for lib_name, lib_address in iter_lib_records(url, lib_type):
+            clean_addr = clean_library_record(lib_address)
+            record = {
+                "lib_name": lib_name,
+                "lib_address": lib_address,
+                "clean_address": clean_addr,
+            }
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+
+            yield lib_name, clean_addr
+
+
+def iter_queue(records, maxsize=QUEUE_SIZE):
+    """
+    Consumes a generator in a separate thread, passing its items through a
+    bounded queue. The thread stops fetching when the queue is full, and
+    stops for good when the consumer stops (e.g. because of an error).
+
+    Input:
+        records (generator): the generator to consume
+        maxsize (int): maximum number of items waiting in the queue
+
+    Output:
+        item: the items of the generator, in the same order
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    errors = []
+
+    def put(item):
+        # Returns False if the consumer stopped before the item was queued
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in records:
+                if not put(item):
+                    break
+        except Exception as error:
+            errors.append(error)
+        finally:
+            records.close()
+            put(_DONE)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+def stream_libs(
+    lib_type, out_path, checkpoint=False, api_key=None, data_path="../data/"
+):
+    """
+    Scrapes, cleans and geocodes the libraries of one type, writing each
+    geocoded library to a csv file. Libraries with the same coordinates as a
+    previous one are skipped.
+
+    Input:
+        lib_type (str): a str containing the code of the type of libraries
+        out_path (str): path to the output csv file
+        checkpoint (bool): if True, the scraped records are also saved in
+            `lib_records_xxx.jsonl` as they arrive
+        api_key (str): Google's API key. If None, it is read from constants.py
+        data_path (str): directory where the checkpoint file is saved
+
+    Output:
+        num_libs (int): number of libraries written to the csv file
+    """
+    gmaps = geocoding_client(api_key)
+    seen_coords = set()
+    num_libs = 0
+
+    records = iter_clean_records(BASE_URL, lib_type, checkpoint, data_path)
+
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["lib_name", "lib_address", "latitude", "longitude"])
+
+        with closing(iter_queue(records)) as clean_records:
+            for lib_name, addr in clean_records:
+                coords = geocode_address(gmaps, addr)
+                if coords and coords not in seen_coords:
+                    seen_coords.add(coords)
+                    writer.writerow([lib_name, addr, coords[0], coords[1]])
+                    num_libs += 1
+
+    return num_libs
+
+
+def export_streamed_data(lib_code, data_path="../data/", checkpoint=False):
+    """
+    Scrapes, cleans and geocodes the libraries of one type, saving them as a
+    csv file (`geocoded_lib_data_xxx.csv`).
+
+    Input:
+        lib_code (str): a str containing the code of the type of libraries
+        data_path (str): directory where the files are saved
+        checkpoint (bool): if True, the scraped records are also saved in
+            `lib_records_xxx.jsonl` as they arrive
+
+    Output:
+        num_libs (int): number of libraries written to the csv file
+    """
+    file_name = data_path + "geocoded_lib_data_" + LIB_CODES[lib_code] + ".csv"
+
+    return stream_libs(lib_code, file_name, checkpoint, data_path=data_path)
+
+
+if __name__ == "__main__":
+    # The library type code can be passed as an argument or in the console
+    if len(sys.argv) > 1:
+        lib_code = sys.argv[1]
+    else:
+        print("Enter the library type code to scrape, clean and geocode:")
+        lib_code = input()
+
+    if lib_code.isdigit() and lib_code in LIB_CODES:
+        export_streamed_data(lib_code)
+    else:
+        print("Please enter a valid library code.")
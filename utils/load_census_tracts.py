@@ -1,8 +1,3 @@
-import sys
-import os
-
-sys.path.append(os.path.abspath(".."))
-
 import pandas as pd
 import geopandas as gpd
 import json
@@ -27,4 +22,5 @@ def create_census_json():
 
 # Calling the function to create json file
 
-create_census_json()
+if __name__ == "__main__":
+    create_census_json()
@@ -1,15 +1,11 @@
-import sys
-import os
-
-sys.path.append(os.path.abspath(".."))
-
 import pandas as pd
-import geopandas as gpd
 
 DATA_PATH = "../data/"
 
 
 def load_data_sources():
+    import geopandas as gpd
+
     # 1. Loading Data
 
     boundaries = gpd.read_file(DATA_PATH + "tl_2020_17_tract20/tl_2020_17_tract20.shp")
@@ -19,6 +15,22 @@ def load_data_sources():
 
     # 2. Using the `acs_data`, we create the broadband access variables
 
+    acs_data = add_share_columns(acs_data)
+
+    return acs_data, fcc_data, libs_data, boundaries
+
+
+def add_share_columns(acs_data):
+    """
+    Creates the broadband access variables (share of households by type of
+    internet access) from the ACS counts. Tracts without households are dropped.
+
+    Input:
+        acs_data (DataFrame): ACS data as exported by `acs_pull.py`
+
+    Output:
+        acs_data (DataFrame): ACS data with the `share_*` variables
+    """
     acs_data.loc[:, "share_broadband"] = (
         acs_data.loc[:, "only_broadband_hh"] * 100 / acs_data.loc[:, "total_hh"]
     )
@@ -34,4 +46,4 @@ def load_data_sources():
     acs_data = acs_data.loc[acs_data.loc[:, "total_hh"] != 0,]
     acs_data.loc[:, "GEOID20"] = acs_data.loc[:, "GEOID20"].astype(str)
 
-    return acs_data, fcc_data, libs_data, boundaries
+    return acs_data
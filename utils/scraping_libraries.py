@@ -3,9 +3,10 @@ File that scrapes libraries
 The types take several values. The source code shows  but 
 """
 
-import requests
 import json
+import sys
 from bs4 import BeautifulSoup
+import http_client
 
 # Last date scrapper was succesfuly executed: Oct. 16, 2023
 
@@ -40,7 +41,7 @@ def retrieve_num_pages(url, lib_type):
     new_url = (url + QUERY_URL + "&page=0").format(types=lib_type)
 
     # Load the main page and parse the HTML:
-    page = requests.get(new_url)
+    page = http_client.get(new_url)
     soup = BeautifulSoup(page.content, "html.parser")
 
     # Find all the page queries in the website and keep the last one
@@ -60,10 +61,10 @@ def retrieve_num_pages(url, lib_type):
     return query_params
 
 
-def scrape_one_lib_type(url, lib_type):
+def iter_lib_records(url, lib_type):
     """
     Takes a library type based on the website's classification for them and
-    scrapes the names and addresses. These are stored in a dictionary.
+    yields the names and addresses page by page, as they are scraped.
 
     Input:
         url (str): a str that contains the base url of the website
@@ -71,12 +72,9 @@ def scrape_one_lib_type(url, lib_type):
             defined in the website's source code.
 
     Output:
-        lib_data (dict): a dict where the key-value pairs are library names and
-        addreses
+        (lib_name, lib_address) (tuple): a library name and one of its
+        addresses, as found in the website
     """
-    # Define structure to save results:
-    lib_data = {}
-
     # Determine the number of pages to scrape:
     query_pages = retrieve_num_pages(url, lib_type)
     num_pages = len(query_pages)
@@ -90,7 +88,7 @@ def scrape_one_lib_type(url, lib_type):
         new_url = (url + QUERY_URL + query_pages[page]).format(types=lib_type)
 
         # Load the main page and parse the HTML:
-        page = requests.get(new_url, timeout=3)
+        page = http_client.get(new_url, timeout=3)
         soup = BeautifulSoup(page.content, "html.parser")
 
         # Find all the <td> tags in the website:
@@ -116,27 +114,63 @@ def scrape_one_lib_type(url, lib_type):
                 lib_address_td = row.find("td", headers=lib_addr_header)
                 lib_address = lib_address_td.get_text().strip()
 
-                # Assign both to directory:
-                if lib_name in lib_data:
-                    lib_data[lib_name].append(lib_address)
-                else:
-                    lib_data[lib_name] = [lib_address]
+                yield lib_name, lib_address
+
+
+def scrape_one_lib_type(url, lib_type):
+    """
+    Takes a library type based on the website's classification for them and
+    scrapes the names and addresses. These are stored in a dictionary.
+
+    Input:
+        url (str): a str that contains the base url of the website
+        lib_type (str): a str containing the code of the type of libraries, as
+            defined in the website's source code.
+
+    Output:
+        lib_data (dict): a dict where the key-value pairs are library names and
+        addreses
+    """
+    # Define structure to save results:
+    lib_data = {}
+
+    for lib_name, lib_address in iter_lib_records(url, lib_type):
+        # Assign both to directory:
+        if lib_name in lib_data:
+            lib_data[lib_name].append(lib_address)
+        else:
+            lib_data[lib_name] = [lib_address]
 
     return lib_data
 
 
+def export_scraped_data(lib_code, data_path="../data/"):
+    """
+    Scrapes the libraries of one type and saves them as a json file
+    (`lib_data_xxx.json`).
+
+    Input:
+        lib_code (str): a str containing the code of the type of libraries
+        data_path (str): directory where the json file is saved
+    """
+    scraped_data = scrape_one_lib_type(BASE_URL, lib_code)
+
+    # Exports the dataset:
+    file_name = data_path + "lib_data_" + LIB_CODES[lib_code] + ".json"
+    with open(file_name, "w", encoding="utf-8") as f:
+        json.dump(scraped_data, f, ensure_ascii=False, indent=4)
+
+
 if __name__ == "__main__":
-    # Initial statements:
-    print("Enter the library type code you want to scrape:")
-    lib_code = input()
+    # The library type code can be passed as an argument or in the console
+    if len(sys.argv) > 1:
+        lib_code = sys.argv[1]
+    else:
+        print("Enter the library type code you want to scrape:")
+        lib_code = input()
 
     # input() gives back a str. We check that digit string represent an integer:
     if lib_code.isdigit() and lib_code in LIB_CODES:
-        scraped_data = scrape_one_lib_type(BASE_URL, lib_code)
-
-        # Exports the dataset:
-        file_name = "../data/lib_data_" + LIB_CODES[lib_code] + ".json"
-        with open(file_name, "w", encoding="utf-8") as f:
-            json.dump(scraped_data, f, ensure_ascii=False, indent=4)
+        export_scraped_data(lib_code)
     else:
         print("Please enter a valid library code.")